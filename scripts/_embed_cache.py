@@ -0,0 +1,117 @@
+"""
+On-disk embedding cache for TERI setup scripts
+Maps sha256(model_name|text) to an int8-quantized embedding stored in SQLite
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+from typing import Callable, Dict, List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "teri", "embeddings.sqlite")
+
+# ONNX exports of embedding models, written by export_minilm_onnx.py as
+# MODELS_DIR/<model_name>/model.onnx plus tokenizer.json
+MODELS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, "models"))
+
+# Stay well below SQLite's host-parameter limit for IN (...) lookups
+_LOOKUP_CHUNK = 500
+
+# Bumped whenever the stored vector format changes; older tables are dropped
+_SCHEMA_VERSION = 2
+
+def _text_hash(model_name: str, text: str) -> str:
+    return hashlib.sha256(f"{model_name}|{text}".encode("utf-8")).hexdigest()
+
+def l2_normalize(embeddings: np.ndarray) -> np.ndarray:
+    """
+    Scale each row to unit length
+    """
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+def quantize(embeddings: np.ndarray) -> np.ndarray:
+    """
+    L2-normalize rows and map them onto int8 with a fixed scale of 127
+    """
+    normalized = l2_normalize(embeddings.astype(np.float32))
+    return np.clip(np.round(normalized * 127), -128, 127).astype(np.int8)
+
+def dequantize(quantized: np.ndarray) -> np.ndarray:
+    """
+    Recover unit-norm float32 rows from quantize() output
+    """
+    return l2_normalize(quantized.astype(np.float32) / 127.0)
+
+def _connect(path: str) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    if conn.execute("PRAGMA user_version").fetchone()[0] != _SCHEMA_VERSION:
+        with conn:
+            conn.execute("DROP TABLE IF EXISTS embeddings")
+            conn.execute(f"PRAGMA user_version={_SCHEMA_VERSION}")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS embeddings (hash TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+    )
+    return conn
+
+def get_or_compute(
+    texts: List[str],
+    model_name: str,
+    encode: Callable[[List[str]], np.ndarray],
+    path: str = CACHE_PATH
+) -> np.ndarray:
+    """
+    Return embeddings for texts, encoding only those missing from the cache
+    Fresh encodes are returned at full precision; cache hits come back
+    dequantized from int8, which keeps cosine ranking near-identical
+    """
+    if not texts:
+        return np.empty((0, 0), dtype=np.float32)
+
+    hashes = [_text_hash(model_name, text) for text in texts]
+    unique_hashes = list(dict.fromkeys(hashes))
+
+    conn = _connect(path)
+    try:
+        hits: Dict[str, np.ndarray] = {}
+        for start in range(0, len(unique_hashes), _LOOKUP_CHUNK):
+            chunk = unique_hashes[start:start + _LOOKUP_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT hash, vector FROM embeddings WHERE hash IN ({placeholders})",
+                chunk
+            )
+            for text_hash, blob in rows:
+                hits[text_hash] = np.frombuffer(blob, dtype=np.int8)
+
+        cached: Dict[str, np.ndarray] = {}
+        if hits:
+            cached.update(zip(hits, dequantize(np.stack(list(hits.values())))))
+
+        misses = {}
+        for text_hash, text in zip(hashes, texts):
+            if text_hash not in cached:
+                misses.setdefault(text_hash, text)
+
+        if misses:
+            computed = np.asarray(encode(list(misses.values())), dtype=np.float32)
+            quantized = quantize(computed)
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (hash, vector) VALUES (?, ?)",
+                    [(text_hash, vector.tobytes()) for text_hash, vector in zip(misses, quantized)]
+                )
+            cached.update(zip(misses, computed))
+
+        logger.info("Embedding cache: %d hits, %d misses", len(unique_hashes) - len(misses), len(misses))
+    finally:
+        conn.close()
+
+    return np.stack([cached[text_hash] for text_hash in hashes])
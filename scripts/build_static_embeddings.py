@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Static Embedding Builder for TERI Model
+Encodes the relationship theme and game context tables once and renders
+them as a Python module of float16 bytes literals for setup-chromadb.py:
+
+    python scripts/build_static_embeddings.py [output_path]
+
+Writes scripts/_static_embeddings.py by default. Re-run whenever
+RELATIONSHIP_THEMES or GAME_CONTEXTS change
+"""
+
+import importlib.util
+import logging
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+OUTPUT_PATH = os.path.join(SCRIPTS_DIR, "_static_embeddings.py")
+
+# Bytes per source line in the rendered literals
+_LINE_BYTES = 48
+
+def load_setup_module():
+    """
+    Import setup-chromadb.py, whose hyphenated name rules out a plain import
+    """
+    spec = importlib.util.spec_from_file_location(
+        "setup_chromadb", os.path.join(SCRIPTS_DIR, "setup-chromadb.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def render_array(name: str, embeddings: np.ndarray) -> str:
+    """
+    Render a 2-D array as a float16 np.frombuffer assignment
+    """
+    raw = embeddings.astype(np.float16).tobytes()
+    lines = [f"        {raw[i:i + _LINE_BYTES]!r}" for i in range(0, len(raw), _LINE_BYTES)]
+    rows, dims = embeddings.shape
+    return (
+        f"{name} = np.frombuffer(\n"
+        f"    (\n" + "\n".join(lines) + "\n    ),\n"
+        f"    dtype=np.float16\n"
+        f").reshape({rows}, {dims})\n"
+    )
+
+def write_atomic(path: str, content: str) -> None:
+    """
+    Write content to a temp file beside path, then rename it into place
+    so readers never see a partially written module
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def main(output_path: str = OUTPUT_PATH):
+    """
+    Main build function
+    """
+    setup = load_setup_module()
+    embedder = setup.EmbeddingService(use_cache=False)
+
+    all_embs = embedder.encode_many(setup._THEME_DOCS + setup._GAME_DOCS)
+    theme_embs = all_embs[:len(setup._THEME_DOCS)]
+    game_embs = all_embs[len(setup._THEME_DOCS):]
+
+    content = (
+        '"""\n'
+        "Generated by scripts/build_static_embeddings.py; do not edit\n"
+        '"""\n'
+        "\n"
+        "import numpy as np\n"
+        "\n"
+        f"MODEL_NAME = {embedder.model_name!r}\n"
+        f"SEED_DIGEST = {setup.seed_digest(embedder.model_name)!r}\n"
+        "\n"
+        + render_array("THEME_EMBEDDINGS", theme_embs)
+        + "\n"
+        + render_array("GAME_EMBEDDINGS", game_embs)
+    )
+    write_atomic(output_path, content)
+    logger.info("Wrote %d static embeddings to %s", len(all_embs), output_path)
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
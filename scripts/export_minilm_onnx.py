@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+ONNX Export Script for TERI Model
+Exports the sentence transformer used by setup-chromadb.py to
+models/<model_name>/model.onnx so embeddings run on ONNX Runtime
+"""
+
+import logging
+import os
+import sys
+
+from optimum.exporters.onnx import main_export
+
+from _embed_cache import MODELS_DIR
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def main(model_name: str = "all-MiniLM-L6-v2"):
+    """
+    Main export function
+    """
+    output_dir = os.path.join(MODELS_DIR, model_name)
+    # The sentence_transformers export includes pooling and normalization,
+    # exposed as the "sentence_embedding" output
+    main_export(
+        f"sentence-transformers/{model_name}",
+        output=output_dir,
+        task="feature-extraction",
+        library_name="sentence_transformers"
+    )
+    logger.info("Exported %s to %s", model_name, output_dir)
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
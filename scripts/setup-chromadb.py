@@ -4,400 +4,637 @@ ChromaDB Setup Script for TERI Model
 Initializes vector database with relationship themes and embeddings
 """
 
+import asyncio
 import chromadb
+import functools
+import hashlib
+import httpx
+import inspect
 import logging
-import json
 import os
-from typing import List, Dict
-from sentence_transformers import SentenceTransformer
+from dataclasses import dataclass
+from typing import List, Dict, Optional, Tuple
+import numpy as np
+
+from _embed_cache import MODELS_DIR, get_or_compute, l2_normalize
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Configuration from environment; the port is converted in main() so that
+# importing this module for its seed tables never depends on it parsing
+CHROMA_HOST = os.getenv("CHROMA_HOST", "localhost")
+CHROMA_PORT = os.getenv("CHROMA_PORT", "8000")
+CHROMA_PERSIST_DIR = os.getenv("CHROMA_PERSIST_DIR")
+
+# Connection attempts against a server that may still be booting
+CONNECT_ATTEMPTS = 3
+
+@dataclass(frozen=True, slots=True)
+class Theme:
+    """
+    Relationship theme used to seed the relationship_themes collection
+    """
+    id: str
+    theme: str
+    description: str
+    examples: Tuple[str, ...]
+
 # Relationship themes for vector similarity search
-RELATIONSHIP_THEMES = [
-    {
-        "id": "resentment",
-        "theme": "resentment",
-        "description": "Built-up anger, frustration, or bitterness toward partner",
-        "examples": [
+RELATIONSHIP_THEMES = (
+    Theme(
+        id="resentment",
+        theme="resentment",
+        description="Built-up anger, frustration, or bitterness toward partner",
+        examples=(
             "You never help with anything",
             "I'm tired of doing everything myself",
             "You don't appreciate what I do",
             "I feel taken for granted",
             "You always leave me to handle things alone"
-        ]
-    },
-    {
-        "id": "disconnection",
-        "theme": "disconnection",
-        "description": "Feeling emotionally distant or unconnected from partner",
-        "examples": [
+        )
+    ),
+    Theme(
+        id="disconnection",
+        theme="disconnection",
+        description="Feeling emotionally distant or unconnected from partner",
+        examples=(
             "We feel like roommates",
             "I miss feeling close to you",
             "We don't talk anymore",
             "I feel alone even when you're here",
             "We're living parallel lives"
-        ]
-    },
-    {
-        "id": "household_labor",
-        "theme": "household_labor",
-        "description": "Conflicts about division of housework and domestic responsibilities",
-        "examples": [
+        )
+    ),
+    Theme(
+        id="household_labor",
+        theme="household_labor",
+        description="Conflicts about division of housework and domestic responsibilities",
+        examples=(
             "You never do the dishes",
             "I'm tired of cleaning up after you",
             "The house is always a mess",
             "I do all the cooking and cleaning",
             "You don't notice when things need to be done"
-        ]
-    },
-    {
-        "id": "appreciation",
-        "theme": "appreciation",
-        "description": "Need for recognition and gratitude from partner",
-        "examples": [
+        )
+    ),
+    Theme(
+        id="appreciation",
+        theme="appreciation",
+        description="Need for recognition and gratitude from partner",
+        examples=(
             "You don't see everything I do",
             "I wish you'd notice my efforts",
             "I need more acknowledgment",
             "You take me for granted",
             "I work hard and get no thanks"
-        ]
-    },
-    {
-        "id": "communication",
-        "theme": "communication",
-        "description": "Issues with how partners talk to each other",
-        "examples": [
+        )
+    ),
+    Theme(
+        id="communication",
+        theme="communication",
+        description="Issues with how partners talk to each other",
+        examples=(
             "You never listen to me",
             "You interrupt me constantly",
             "We can't have a conversation without fighting",
             "You shut down when I try to talk",
             "You don't hear what I'm saying"
-        ]
-    },
-    {
-        "id": "time_together",
-        "theme": "time_together",
-        "description": "Desire for more quality time and attention from partner",
-        "examples": [
+        )
+    ),
+    Theme(
+        id="time_together",
+        theme="time_together",
+        description="Desire for more quality time and attention from partner",
+        examples=(
             "We never spend time together",
             "You're always on your phone",
             "You prioritize everything over us",
             "I miss our connection time",
             "We need more couple time"
-        ]
-    },
-    {
-        "id": "financial_stress",
-        "theme": "financial_stress",
-        "description": "Money-related tensions and disagreements",
-        "examples": [
+        )
+    ),
+    Theme(
+        id="financial_stress",
+        theme="financial_stress",
+        description="Money-related tensions and disagreements",
+        examples=(
             "We can't afford this",
             "You spend too much money",
             "I'm worried about our finances",
             "We have different spending priorities",
             "Money is always tight"
-        ]
-    },
-    {
-        "id": "intimacy",
-        "theme": "intimacy",
-        "description": "Physical and emotional intimacy concerns",
-        "examples": [
+        )
+    ),
+    Theme(
+        id="intimacy",
+        theme="intimacy",
+        description="Physical and emotional intimacy concerns",
+        examples=(
             "We're not intimate anymore",
             "I miss physical closeness",
             "You don't initiate affection",
             "I feel rejected when you pull away",
             "We've lost our spark"
-        ]
-    },
-    {
-        "id": "parenting",
-        "theme": "parenting",
-        "description": "Disagreements about child-rearing and parenting approaches",
-        "examples": [
+        )
+    ),
+    Theme(
+        id="parenting",
+        theme="parenting",
+        description="Disagreements about child-rearing and parenting approaches",
+        examples=(
             "You're too strict with the kids",
             "I do all the parenting work",
             "We disagree on discipline",
             "You don't help with bedtime",
             "The kids listen to you but not me"
-        ]
-    },
-    {
-        "id": "trust",
-        "theme": "trust",
-        "description": "Issues with honesty, reliability, and faith in partner",
-        "examples": [
+        )
+    ),
+    Theme(
+        id="trust",
+        theme="trust",
+        description="Issues with honesty, reliability, and faith in partner",
+        examples=(
             "I don't trust you anymore",
             "You broke your promise again",
             "I can't rely on you",
             "You hide things from me",
             "I need to know you're being honest"
-        ]
-    },
-    {
-        "id": "control",
-        "theme": "control",
-        "description": "Power dynamics and control issues in the relationship",
-        "examples": [
+        )
+    ),
+    Theme(
+        id="control",
+        theme="control",
+        description="Power dynamics and control issues in the relationship",
+        examples=(
             "You always have to be right",
             "You make all the decisions",
             "I feel controlled by you",
             "You don't consider my opinions",
             "It's your way or the highway"
-        ]
-    },
-    {
-        "id": "support",
-        "theme": "support",
-        "description": "Need for emotional and practical support from partner",
-        "examples": [
+        )
+    ),
+    Theme(
+        id="support",
+        theme="support",
+        description="Need for emotional and practical support from partner",
+        examples=(
             "You're not there for me",
             "I need you to have my back",
             "You don't support my dreams",
             "I feel like I'm on my own",
             "You don't encourage me"
-        ]
-    },
-    {
-        "id": "in_laws",
-        "theme": "in_laws",
-        "description": "Conflicts involving extended family members",
-        "examples": [
+        )
+    ),
+    Theme(
+        id="in_laws",
+        theme="in_laws",
+        description="Conflicts involving extended family members",
+        examples=(
             "Your mother interferes too much",
             "You always side with your family",
             "I don't feel welcome with your relatives",
             "Your parents don't respect me",
             "Family events are stressful"
-        ]
-    },
-    {
-        "id": "jealousy",
-        "theme": "jealousy",
-        "description": "Feelings of jealousy or insecurity about partner's relationships",
-        "examples": [
+        )
+    ),
+    Theme(
+        id="jealousy",
+        theme="jealousy",
+        description="Feelings of jealousy or insecurity about partner's relationships",
+        examples=(
             "You flirt with other people",
             "I feel threatened by your friend",
             "You give others more attention",
             "I'm worried about your coworker",
             "You text them too much"
-        ]
-    },
-    {
-        "id": "personal_growth",
-        "theme": "personal_growth",
-        "description": "Individual development and self-improvement journeys",
-        "examples": [
+        )
+    ),
+    Theme(
+        id="personal_growth",
+        theme="personal_growth",
+        description="Individual development and self-improvement journeys",
+        examples=(
             "You don't support my goals",
             "I'm growing and you're staying the same",
             "We want different things now",
             "I need space to develop myself",
             "You hold me back from changing"
-        ]
+        )
+    )
+)
+
+def _prepare_themes():
+    """
+    Flatten RELATIONSHIP_THEMES into parallel id/document/metadata lists
+    """
+    ids, documents, metadatas = [], [], []
+    for t in RELATIONSHIP_THEMES:
+        ids.append(t.id)
+        # Create a comprehensive text representation
+        documents.append(" ".join((t.theme, t.description, *t.examples)))
+        metadatas.append({
+            "theme": t.theme,
+            "description": t.description,
+            "examples_count": len(t.examples)
+        })
+    return ids, documents, metadatas
+
+# Built once at import so populating never re-walks the theme dicts
+_THEME_IDS, _THEME_DOCS, _THEME_METAS = _prepare_themes()
+
+# Game recommendation contexts matched against conversation themes
+GAME_CONTEXTS = [
+    {
+        "id": "iwr_daily_checkin",
+        "context": "daily emotional check-in feeling disconnected need quick connection",
+        "game_id": "iwr",
+        "rationale": "Quick daily emotional check-in to rebuild connection",
+        "themes": ["disconnection", "communication"]
+    },
+    {
+        "id": "pause_conflict_spiral",
+        "context": "arguing fighting conflict spiraling elevated emotions",
+        "game_id": "pause",
+        "rationale": "Stop the conflict spiral and take accountability",
+        "themes": ["communication", "control"]
+    },
+    {
+        "id": "and_what_else_resentment",
+        "context": "built up resentment anger frustration unexpressed",
+        "game_id": "and_what_else",
+        "rationale": "Clear accumulated resentments safely",
+        "themes": ["resentment", "communication"]
+    },
+    {
+        "id": "pillar_talk_foundation",
+        "context": "relationship foundation values principles basic connection",
+        "game_id": "pillar_talk",
+        "rationale": "Reconnect with relationship foundations",
+        "themes": ["support", "communication"]
+    },
+    {
+        "id": "closeness_counter_intimacy",
+        "context": "feeling distant disconnected roommates physical emotional distance",
+        "game_id": "closeness_counter",
+        "rationale": "Explore physical and emotional distance patterns",
+        "themes": ["disconnection", "intimacy"]
+    },
+    {
+        "id": "switch_perspective_taking",
+        "context": "different views opinions perspective understanding disagreement",
+        "game_id": "switch",
+        "rationale": "Build empathy by arguing partner's position",
+        "themes": ["communication", "control"]
+    },
+    {
+        "id": "bomb_squad_recurring_issue",
+        "context": "same fight recurring issue never resolved keeps coming up",
+        "game_id": "bomb_squad",
+        "rationale": "Systematically defuse a recurring conflict",
+        "themes": ["communication", "resentment"]
+    },
+    {
+        "id": "seven_nights_vulnerability",
+        "context": "need vulnerability sharing truth deeper connection intimacy",
+        "game_id": "seven_nights",
+        "rationale": "Build vulnerability and truth-sharing muscle",
+        "themes": ["intimacy", "trust"]
     }
 ]
 
-def setup_chroma_client(host: str = "localhost", port: int = 8000) -> chromadb.Client:
+def theme_filter(theme: str) -> Dict[str, bool]:
+    """
+    Build a where clause matching game contexts tagged with theme
+    """
+    return {f"theme_{theme}": True}
+
+def _game_metadata(ctx: Dict) -> Dict:
+    """
+    Flatten a game context into chroma metadata
+    Themes are stored as "|a|b|" for cheap splitting, plus one boolean flag
+    per theme so queries can filter server-side with theme_filter()
+    """
+    metadata = {
+        "game_id": ctx["game_id"],
+        "rationale": ctx["rationale"],
+        "themes": "|" + "|".join(ctx["themes"]) + "|"
+    }
+    for theme in ctx["themes"]:
+        metadata.update(theme_filter(theme))
+    return metadata
+
+_GAME_IDS = [ctx["id"] for ctx in GAME_CONTEXTS]
+_GAME_DOCS = [ctx["context"] for ctx in GAME_CONTEXTS]
+_GAME_METAS = [_game_metadata(ctx) for ctx in GAME_CONTEXTS]
+
+# Matches the max_seq_length of all-MiniLM-L6-v2
+ONNX_MAX_LENGTH = 256
+
+# The static seed collections hold only a few dozen rows, so they get a
+# smaller HNSW graph; translator_history grows and keeps chroma's defaults.
+SMALL_COLLECTION_HNSW = {
+    "hnsw:M": 8,
+    "hnsw:construction_ef": 64,
+    "hnsw:search_ef": 32
+}
+
+# Collections required by the TERI model, as (name, metadata) pairs
+# All collections use inner-product space, which equals cosine similarity
+# without the per-distance normalization. Invariant: every vector inserted
+# into these collections (and every query vector) must be unit-norm.
+COLLECTION_SPECS = [
+    ("relationship_themes", {
+        "description": "Semantic themes for relationship conflicts and conversations",
+        "hnsw:space": "ip",
+        **SMALL_COLLECTION_HNSW
+    }),
+    ("translator_history", {
+        "description": "Historical translator outputs for pattern learning",
+        "hnsw:space": "ip"
+    }),
+    ("game_contexts", {
+        "description": "Game recommendation contexts and patterns",
+        "hnsw:space": "ip",
+        **SMALL_COLLECTION_HNSW
+    })
+]
+
+# Rows per collection.add() call during bulk loads
+BATCH = 200
+
+# Applied to a freshly created local database before the bulk load; the
+# setup script can always rebuild it, so durability is traded for speed
+BULK_LOAD_PRAGMAS = [
+    "PRAGMA journal_mode=OFF",
+    "PRAGMA synchronous=OFF",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536"
+]
+
+async def _resolve(result):
+    """
+    Await result from the async HTTP client; PersistentClient calls return directly
+    """
+    if inspect.isawaitable(result):
+        return await result
+    return result
+
+async def setup_chroma_client(host: str = "localhost", port: int = 8000, persist_dir: Optional[str] = None) -> chromadb.Client:
     """
     Set up ChromaDB client connection
+    Uses an embedded PersistentClient when persist_dir is given, otherwise
+    connects to the ChromaDB server with the async HTTP client, retrying
+    with exponential backoff while the server finishes starting up
     """
-    try:
-        client = chromadb.HttpClient(host=host, port=port)
-        logger.info(f"Connected to ChromaDB at {host}:{port}")
+    if persist_dir:
+        fresh_db = not os.path.exists(os.path.join(persist_dir, "chroma.sqlite3"))
+        client = chromadb.PersistentClient(path=persist_dir)
+        logger.info("Opened local ChromaDB at %s", persist_dir)
+        if fresh_db:
+            tune_for_bulk_load(client)
         return client
-    except Exception as e:
-        logger.error(f"Failed to connect to ChromaDB: {e}")
-        raise
+    
+    for attempt in range(CONNECT_ATTEMPTS):
+        try:
+            client = await chromadb.AsyncHttpClient(host=host, port=port)
+            logger.info("Connected to ChromaDB at %s:%d", host, port)
+            return client
+        # chromadb reports an unreachable server as ValueError during tenant validation
+        except (httpx.ConnectError, OSError, ValueError) as e:
+            if attempt == CONNECT_ATTEMPTS - 1:
+                logger.error("Failed to connect to ChromaDB: %s", e)
+                raise
+            delay = 2 ** attempt
+            logger.warning("ChromaDB not reachable (%s); retrying in %ds", e, delay)
+            await asyncio.sleep(delay)
 
-def create_collections(client: chromadb.Client) -> Dict[str, chromadb.Collection]:
+def tune_for_bulk_load(client: chromadb.Client) -> None:
     """
-    Create necessary collections for TERI model
+    Relax SQLite durability on a new local database before bulk inserts
     """
-    collections = {}
-    
-    # Relationship themes collection
     try:
-        collections["relationship_themes"] = client.create_collection(
-            name="relationship_themes",
-            metadata={"description": "Semantic themes for relationship conflicts and conversations"}
-        )
-        logger.info("Created relationship_themes collection")
-    except Exception as e:
-        if "already exists" in str(e):
-            collections["relationship_themes"] = client.get_collection("relationship_themes")
-            logger.info("Using existing relationship_themes collection")
-        else:
-            raise e
+        conn = client._server._sysdb._conn_pool.connect()
+    except AttributeError:
+        logger.warning("ChromaDB internals changed; skipping bulk load pragmas")
+        return
+    for pragma in BULK_LOAD_PRAGMAS:
+        conn.execute(pragma)
+    logger.info("Applied bulk load pragmas to new local database")
+
+async def _bulk_add(
+    collection: chromadb.Collection,
+    ids: List[str],
+    documents: List[str],
+    metadatas: List[Dict],
+    embeddings: np.ndarray
+) -> None:
+    """
+    Write rows in chunks of BATCH so each upsert() is one bounded transaction
+    Upserting rewrites seed rows left by earlier runs instead of skipping
+    their ids, so metadata format changes reach existing collections
+    """
+    for i in range(0, len(ids), BATCH):
+        await _resolve(collection.upsert(
+            ids=ids[i:i + BATCH],
+            documents=documents[i:i + BATCH],
+            metadatas=metadatas[i:i + BATCH],
+            embeddings=embeddings[i:i + BATCH]
+        ))
+
+async def create_collections(client: chromadb.Client) -> Dict[str, chromadb.Collection]:
+    """
+    Create necessary collections for TERI model, reusing any that already exist
+    """
+    created = await asyncio.gather(*[
+        _resolve(client.get_or_create_collection(name=name, metadata=metadata))
+        for name, metadata in COLLECTION_SPECS
+    ])
+    collections = {name: collection for (name, _), collection in zip(COLLECTION_SPECS, created)}
+    logger.info("Using collections: %s", ", ".join(collections))
+    return collections
+
+@functools.lru_cache(maxsize=4)
+def _get_model(model_name: str):
+    """
+    Load a sentence transformer once per process, warm on the best device
+    On CUDA the weights are cast to FP16 to halve memory traffic per batch
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
     
-    # Translator history collection
-    try:
-        collections["translator_history"] = client.create_collection(
-            name="translator_history",
-            metadata={"description": "Historical translator outputs for pattern learning"}
-        )
-        logger.info("Created translator_history collection")
-    except Exception as e:
-        if "already exists" in str(e):
-            collections["translator_history"] = client.get_collection("translator_history")
-            logger.info("Using existing translator_history collection")
-        else:
-            raise e
+    torch.set_grad_enabled(False)
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    model = SentenceTransformer(model_name, device=device)
+    if device == "cuda":
+        model.half()
+    model.eval()
+    logger.info("Loaded embedding model %s on %s", model_name, device)
+    return model
+
+@functools.lru_cache(maxsize=4)
+def _get_onnx_session(model_dir: str):
+    """
+    Load an exported ONNX model and its tokenizer once per process
+    """
+    import onnxruntime as ort
+    from tokenizers import Tokenizer
     
-    # Game suggestions collection
-    try:
-        collections["game_contexts"] = client.create_collection(
-            name="game_contexts",
-            metadata={"description": "Game recommendation contexts and patterns"}
+    available = ort.get_available_providers()
+    providers = [p for p in ("CUDAExecutionProvider", "CPUExecutionProvider") if p in available]
+    session = ort.InferenceSession(os.path.join(model_dir, "model.onnx"), providers=providers)
+    tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+    tokenizer.enable_padding()
+    tokenizer.enable_truncation(max_length=ONNX_MAX_LENGTH)
+    logger.info("Loaded ONNX embedding model from %s on %s", model_dir, session.get_providers()[0])
+    return session, tokenizer
+
+class EmbeddingService:
+    """
+    Embedding model wrapper that loads the model once per run
+    Uses an ONNX Runtime export from MODELS_DIR when one exists, which
+    avoids importing torch; otherwise falls back to sentence transformers.
+    Embeddings are served from the on-disk cache where possible, so the
+    model is only loaded when a cache miss actually needs encoding
+    """
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", use_cache: bool = True):
+        self.model_name = model_name
+        self.use_cache = use_cache
+        self.onnx_dir = os.path.join(MODELS_DIR, model_name)
+
+    @property
+    def model(self):
+        return _get_model(self.model_name)
+
+    def _encode(self, texts: List[str], batch_size: int) -> np.ndarray:
+        if os.path.exists(os.path.join(self.onnx_dir, "model.onnx")):
+            return self._encode_onnx(texts, batch_size)
+        return self._encode_torch(texts, batch_size)
+
+    def _encode_onnx(self, texts: List[str], batch_size: int) -> np.ndarray:
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        
+        session, tokenizer = _get_onnx_session(self.onnx_dir)
+        input_names = {i.name for i in session.get_inputs()}
+        output_names = [o.name for o in session.get_outputs()]
+        
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            encodings = tokenizer.encode_batch(texts[start:start + batch_size])
+            feeds = {
+                "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+                "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+                "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64)
+            }
+            feeds = {name: value for name, value in feeds.items() if name in input_names}
+            
+            if "sentence_embedding" in output_names:
+                (embeddings,) = session.run(["sentence_embedding"], feeds)
+            else:
+                # Plain transformer export: mean-pool token embeddings over the mask
+                (tokens,) = session.run([output_names[0]], feeds)
+                mask = feeds["attention_mask"][..., np.newaxis].astype(np.float32)
+                embeddings = (tokens * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+            batches.append(embeddings)
+        
+        return l2_normalize(np.concatenate(batches).astype(np.float32))
+
+    def _encode_torch(self, texts: List[str], batch_size: int) -> np.ndarray:
+        embeddings = self.model.encode(
+            texts,
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True
         )
-        logger.info("Created game_contexts collection")
-    except Exception as e:
-        if "already exists" in str(e):
-            collections["game_contexts"] = client.get_collection("game_contexts")
-            logger.info("Using existing game_contexts collection")
+        # Chroma expects float32 regardless of the model's compute dtype
+        return embeddings.astype(np.float32, copy=False)
+
+    def encode_many(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        """
+        Generate unit-norm embeddings for texts in batched forward passes
+        Unit norm is required by the "ip" space of every TERI collection
+        """
+        if self.use_cache:
+            embeddings = get_or_compute(
+                texts,
+                self.model_name,
+                lambda misses: self._encode(misses, batch_size)
+            )
         else:
-            raise e
-    
-    return collections
+            embeddings = self._encode(texts, batch_size)
+        logger.info("Generated %d embeddings", len(embeddings))
+        return embeddings
 
-def generate_embeddings(texts: List[str], model_name: str = "all-MiniLM-L6-v2") -> List[List[float]]:
+def seed_digest(model_name: str) -> str:
     """
-    Generate embeddings using sentence transformers
+    Fingerprint the seed documents and model that static embeddings were built from
     """
-    model = SentenceTransformer(model_name)
-    embeddings = model.encode(texts).tolist()
-    logger.info(f"Generated {len(embeddings)} embeddings")
-    return embeddings
+    digest = hashlib.sha256(model_name.encode("utf-8"))
+    for doc in _THEME_DOCS + _GAME_DOCS:
+        digest.update(b"\0" + doc.encode("utf-8"))
+    return digest.hexdigest()
 
-def populate_relationship_themes(collection: chromadb.Collection) -> None:
+def load_static_embeddings(model_name: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Load the theme and game embeddings baked into _static_embeddings.py
+    Returns None when the module is missing or was built from other data
+    """
+    try:
+        import _static_embeddings as static
+    except ImportError:
+        return None
+    except (SyntaxError, ValueError) as e:
+        logger.warning("Ignoring unreadable _static_embeddings.py (%s); re-run build_static_embeddings.py", e)
+        return None
+    if getattr(static, "SEED_DIGEST", None) != seed_digest(model_name):
+        logger.warning("Ignoring stale _static_embeddings.py; re-run build_static_embeddings.py")
+        return None
+    logger.info("Loaded prebuilt embeddings from _static_embeddings.py")
+    # Stored as float16; widen and restore unit norm for the "ip" collections
+    return (
+        l2_normalize(static.THEME_EMBEDDINGS.astype(np.float32)),
+        l2_normalize(static.GAME_EMBEDDINGS.astype(np.float32))
+    )
+
+def embed_seed_documents(embedder: EmbeddingService) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Embed the theme and game documents for both collections
+    Without prebuilt embeddings, both tables are concatenated and encoded
+    in a single encode_many call, then sliced back apart
+    """
+    static = load_static_embeddings(embedder.model_name)
+    if static is not None:
+        return static
+    
+    all_embs = embedder.encode_many(_THEME_DOCS + _GAME_DOCS)
+    return all_embs[:len(_THEME_DOCS)], all_embs[len(_THEME_DOCS):]
+
+async def populate_relationship_themes(collection: chromadb.Collection, embeddings: np.ndarray) -> None:
     """
     Populate the relationship themes collection with initial data
     """
     logger.info("Populating relationship themes collection...")
     
-    # Prepare data for insertion
-    documents = []
-    metadatas = []
-    ids = []
-    
-    for theme_data in RELATIONSHIP_THEMES:
-        # Create a comprehensive text representation
-        text_content = f"{theme_data['theme']} {theme_data['description']} {' '.join(theme_data['examples'])}"
-        documents.append(text_content)
-        
-        metadatas.append({
-            "theme": theme_data["theme"],
-            "description": theme_data["description"],
-            "examples_count": len(theme_data["examples"])
-        })
-        
-        ids.append(theme_data["id"])
-    
-    # Generate embeddings
-    embeddings = generate_embeddings(documents)
-    
     # Insert into collection
-    collection.add(
-        documents=documents,
-        metadatas=metadatas,
-        ids=ids,
-        embeddings=embeddings
-    )
+    await _bulk_add(collection, _THEME_IDS, _THEME_DOCS, _THEME_METAS, embeddings)
     
-    logger.info(f"Added {len(documents)} relationship themes to collection")
+    logger.info("Added %d relationship themes to collection", len(_THEME_DOCS))
 
-def populate_game_contexts(collection: chromadb.Collection) -> None:
+async def populate_game_contexts(collection: chromadb.Collection, embeddings: np.ndarray) -> None:
     """
     Populate game contexts for recommendation engine
     """
     logger.info("Populating game contexts collection...")
     
-    game_contexts = [
-        {
-            "id": "iwr_daily_checkin",
-            "context": "daily emotional check-in feeling disconnected need quick connection",
-            "game_id": "iwr",
-            "rationale": "Quick daily emotional check-in to rebuild connection",
-            "themes": ["disconnection", "communication"]
-        },
-        {
-            "id": "pause_conflict_spiral",
-            "context": "arguing fighting conflict spiraling elevated emotions",
-            "game_id": "pause",
-            "rationale": "Stop the conflict spiral and take accountability",
-            "themes": ["communication", "control"]
-        },
-        {
-            "id": "and_what_else_resentment",
-            "context": "built up resentment anger frustration unexpressed",
-            "game_id": "and_what_else",
-            "rationale": "Clear accumulated resentments safely",
-            "themes": ["resentment", "communication"]
-        },
-        {
-            "id": "pillar_talk_foundation",
-            "context": "relationship foundation values principles basic connection",
-            "game_id": "pillar_talk",
-            "rationale": "Reconnect with relationship foundations",
-            "themes": ["support", "communication"]
-        },
-        {
-            "id": "closeness_counter_intimacy",
-            "context": "feeling distant disconnected roommates physical emotional distance",
-            "game_id": "closeness_counter",
-            "rationale": "Explore physical and emotional distance patterns",
-            "themes": ["disconnection", "intimacy"]
-        },
-        {
-            "id": "switch_perspective_taking",
-            "context": "different views opinions perspective understanding disagreement",
-            "game_id": "switch",
-            "rationale": "Build empathy by arguing partner's position",
-            "themes": ["communication", "control"]
-        },
-        {
-            "id": "bomb_squad_recurring_issue",
-            "context": "same fight recurring issue never resolved keeps coming up",
-            "game_id": "bomb_squad",
-            "rationale": "Systematically defuse a recurring conflict",
-            "themes": ["communication", "resentment"]
-        },
-        {
-            "id": "seven_nights_vulnerability",
-            "context": "need vulnerability sharing truth deeper connection intimacy",
-            "game_id": "seven_nights",
-            "rationale": "Build vulnerability and truth-sharing muscle",
-            "themes": ["intimacy", "trust"]
-        }
-    ]
-    
-    # Prepare data for insertion
-    documents = [ctx["context"] for ctx in game_contexts]
-    metadatas = [
-        {
-            "game_id": ctx["game_id"],
-            "rationale": ctx["rationale"],
-            "themes": json.dumps(ctx["themes"])
-        }
-        for ctx in game_contexts
-    ]
-    ids = [ctx["id"] for ctx in game_contexts]
-    
-    # Generate embeddings
-    embeddings = generate_embeddings(documents)
-    
     # Insert into collection
-    collection.add(
-        documents=documents,
-        metadatas=metadatas,
-        ids=ids,
-        embeddings=embeddings
-    )
+    await _bulk_add(collection, _GAME_IDS, _GAME_DOCS, _GAME_METAS, embeddings)
     
-    logger.info(f"Added {len(documents)} game contexts to collection")
+    logger.info("Added %d game contexts to collection", len(_GAME_DOCS))
 
-def test_similarity_search(collections: Dict[str, chromadb.Collection]) -> None:
+async def test_similarity_search(collections: Dict[str, chromadb.Collection]) -> None:
     """
     Test similarity search functionality
     """
@@ -413,53 +650,76 @@ def test_similarity_search(collections: Dict[str, chromadb.Collection]) -> None:
     
     themes_collection = collections["relationship_themes"]
     
-    for query in test_queries:
-        results = themes_collection.query(
-            query_texts=[query],
-            n_results=3
-        )
-        
-        logger.info(f"Query: '{query}'")
-        for i, (doc, metadata, distance) in enumerate(zip(
-            results["documents"][0],
-            results["metadatas"][0],
-            results["distances"][0]
-        )):
-            logger.info(f"  {i+1}. Theme: {metadata['theme']} (distance: {distance:.3f})")
+    # Test game contexts filtered to a single theme
+    game_query, game_theme = "We've lost our spark", "intimacy"
+    
+    # All theme queries go out as one batch, so one round-trip and one forward pass
+    results, game_results = await asyncio.gather(
+        _resolve(themes_collection.query(query_texts=test_queries, n_results=3)),
+        _resolve(collections["game_contexts"].query(
+            query_texts=[game_query],
+            n_results=3,
+            where=theme_filter(game_theme)
+        ))
+    )
+    
+    # Results are aligned per query, so rank every query in one argsort
+    dists = np.asarray(results["distances"])
+    orders = np.argsort(dists, axis=1)
+    for qi, query in enumerate(test_queries):
+        logger.info("Query: '%s'", query)
+        metadatas = results["metadatas"][qi]
+        for rank, idx in enumerate(orders[qi]):
+            logger.info("  %d. Theme: %s (distance: %.3f)", rank + 1, metadatas[idx]["theme"], dists[qi, idx])
         logger.info("")
+    
+    logger.info("Game query (%s): '%s'", game_theme, game_query)
+    game_dists = np.asarray(game_results["distances"][0])
+    game_metas = game_results["metadatas"][0]
+    for rank, idx in enumerate(np.argsort(game_dists)):
+        metadata = game_metas[idx]
+        logger.info(
+            "  %d. Game: %s themes=%s (distance: %.3f)",
+            rank + 1, metadata["game_id"], metadata["themes"], game_dists[idx]
+        )
+    logger.info("")
 
-def main():
+async def main():
     """
     Main setup function
     """
-    # Get configuration from environment
-    chroma_host = os.getenv("CHROMA_HOST", "localhost")
-    chroma_port = int(os.getenv("CHROMA_PORT", "8000"))
-    
     logger.info("Starting ChromaDB setup for TERI Model...")
     
     try:
         # Setup client and collections
-        client = setup_chroma_client(chroma_host, chroma_port)
-        collections = create_collections(client)
+        client = await setup_chroma_client(CHROMA_HOST, int(CHROMA_PORT), CHROMA_PERSIST_DIR)
+        collections = await create_collections(client)
         
-        # Populate collections
-        populate_relationship_themes(collections["relationship_themes"])
-        populate_game_contexts(collections["game_contexts"])
+        # Embed both tables up front; the model only loads if prebuilt
+        # embeddings are missing and the cache cannot serve them
+        theme_embs, game_embs = embed_seed_documents(EmbeddingService())
+        
+        # Populate collections concurrently
+        await asyncio.gather(
+            populate_relationship_themes(collections["relationship_themes"], theme_embs),
+            populate_game_contexts(collections["game_contexts"], game_embs)
+        )
         
         # Test functionality
-        test_similarity_search(collections)
+        await test_similarity_search(collections)
         
         logger.info("ChromaDB setup completed successfully!")
         
         # Print collection stats
-        for name, collection in collections.items():
-            count = collection.count()
-            logger.info(f"Collection '{name}': {count} documents")
+        counts = await asyncio.gather(*[
+            _resolve(collection.count()) for collection in collections.values()
+        ])
+        for name, count in zip(collections, counts):
+            logger.info("Collection '%s': %d documents", name, count)
             
     except Exception as e:
-        logger.error(f"Setup failed: {e}")
+        logger.error("Setup failed: %s", e)
         raise
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    asyncio.run(main())
\ No newline at end of file